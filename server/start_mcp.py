@@ -2,14 +2,12 @@ import os
 import sys
 import argparse
 import importlib.util
-import inspect
 import asyncio
+import contextlib
+import functools
+import types
 
-from agency_swarm import BaseTool
-from agency_swarm.integrations.mcp_server import run_mcp
-from starlette.applications import Starlette
-from starlette.routing import Mount
-from stdio_utils import load_stdio_mcp_tools
+from stdio_utils import load_stdio_mcp_tools, shutdown_stdio_mcp_servers
 
 # Default configuration
 DEFAULT_TOOLS_DIR = "./tools"
@@ -20,8 +18,12 @@ DEFAULT_MCP_INCLUDE_SUBDIRS = "false"
 DEFAULT_MCP_SPLIT_SUBDIRS = "false"
 
 
+@functools.lru_cache(maxsize=1)
 def get_config():
-    """Get configuration from environment variables with CLI argument overrides"""
+    """Get configuration from environment variables with CLI argument overrides
+
+    The result is cached so that main() and setup_uvicorn_app() share a single parse.
+    """
     # Read from environment variables first
     tools_dir = os.getenv("MCP_TOOLS_DIR", DEFAULT_TOOLS_DIR)
     host = os.getenv("MCP_HOST", DEFAULT_HOST)
@@ -34,6 +36,17 @@ def get_config():
         "MCP_SPLIT_SUBDIRS", DEFAULT_MCP_SPLIT_SUBDIRS
     ).lower() in ("1", "true", "yes", "y", "on")
 
+    # Without CLI arguments there is nothing to override, so skip building the parser
+    if len(sys.argv) == 1:
+        return types.SimpleNamespace(
+            tools_dir=tools_dir,
+            host=host,
+            port=port,
+            name=instance_name,
+            include_subdirs=include_subdirs,
+            split_subdirs=split_subdirs,
+        )
+
     # Parse command line arguments to override env vars
     parser = argparse.ArgumentParser(
         description="Start MCP server with ALL tools from subdirectories"
@@ -85,6 +98,14 @@ def setup_python_path():
         sys.path.insert(0, tools_dir)
 
 
+@functools.lru_cache(maxsize=4096)
+def _is_tool_subclass(cls):
+    """Memoized check for BaseTool subclasses (re-exported classes repeat across modules)"""
+    from agency_swarm import BaseTool
+
+    return issubclass(cls, BaseTool)
+
+
 def load_tools_from_directory(directory, parent_only=False):
     """Load all tool classes from a directory
 
@@ -100,65 +121,60 @@ def load_tools_from_directory(directory, parent_only=False):
         print(f"Directory does not exist: {directory}")
         return tools
 
-    # Get Python files in the directory
-    if parent_only:
-        # Only get files in the parent directory
-        files = [
-            f
-            for f in os.listdir(directory)
-            if os.path.isfile(os.path.join(directory, f))
-            and f.endswith(".py")
-            and not f.startswith("__")
-        ]
-
-        for file in files:
-            file_path = os.path.join(directory, file)
-            try:
-                # Load the module
-                module_name = os.path.splitext(file)[0]
-                spec = importlib.util.spec_from_file_location(module_name, file_path)
-                if spec and spec.loader:
-                    module = importlib.util.module_from_spec(spec)
-                    spec.loader.exec_module(module)
-
-                    # Find all BaseTool subclasses in the module
-                    for name, obj in inspect.getmembers(module):
-                        if (
-                            inspect.isclass(obj)
-                            and issubclass(obj, BaseTool)
-                            and obj.__module__ == module.__name__
-                        ):
-                            tools.append(obj)
-                            loaded_count += 1
-            except Exception as e:
-                print(f"Error loading {file_path}: {e}")
-    else:
-        # Walk through the directory and subdirectories
-        for root, _, files in os.walk(directory):
-            for file in files:
-                if file.endswith(".py") and not file.startswith("__"):
-                    file_path = os.path.join(root, file)
-                    try:
-                        # Load the module
-                        module_name = os.path.splitext(file)[0]
-                        spec = importlib.util.spec_from_file_location(
-                            module_name, file_path
-                        )
-                        if spec and spec.loader:
-                            module = importlib.util.module_from_spec(spec)
-                            spec.loader.exec_module(module)
-
-                            # Find all BaseTool subclasses in the module
-                            for name, obj in inspect.getmembers(module):
-                                if (
-                                    inspect.isclass(obj)
-                                    and issubclass(obj, BaseTool)
-                                    and obj.__module__ == module.__name__
-                                ):
-                                    tools.append(obj)
-                                    loaded_count += 1
-                    except Exception as e:
-                        print(f"Error loading {file_path}: {e}")
+    def _scan_py(d):
+        """Yield tool file paths, descending into subdirectories unless parent_only"""
+        try:
+            it = os.scandir(d)
+        except OSError:
+            # Skip unreadable directories (e.g. lost+found), as os.walk did
+            return
+        with it:
+            for entry in it:
+                name = entry.name
+                # Screen on the name first; it needs no syscall
+                if name[:2] == "__" or entry.is_symlink():
+                    continue
+                if name[-3:] == ".py" and len(name) > 3 and entry.is_file():
+                    yield entry.path
+                elif not parent_only and name[0] != "." and entry.is_dir():
+                    yield from _scan_py(entry.path)
+
+    def _load_one(file_path):
+        """Import a single tool module, returning None if it fails to load"""
+        try:
+            module_name = os.path.splitext(os.path.basename(file_path))[0]
+            spec = importlib.util.spec_from_file_location(module_name, file_path)
+            if spec and spec.loader:
+                module = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(module)
+                return module
+        except Exception as e:
+            print(f"Error loading {file_path}: {e}")
+        return None
+
+    # Import on the calling thread: tool modules may use signal or the event loop at import
+    paths = list(_scan_py(directory))
+    modules = [_load_one(path) for path in paths]
+
+    for file_path, module in zip(paths, modules):
+        if module is None:
+            continue
+
+        try:
+            # Find all BaseTool subclasses in the module
+            module_tools = [
+                obj
+                for obj in list(module.__dict__.values())
+                if isinstance(obj, type)
+                and _is_tool_subclass(obj)
+                and obj.__module__ == module.__name__
+            ]
+        except Exception as e:
+            print(f"Error loading {file_path}: {e}")
+            continue
+
+        tools.extend(module_tools)
+        loaded_count += len(module_tools)
 
     print(f"Loaded {loaded_count} tools from {directory}")
     return tools
@@ -166,27 +182,37 @@ def load_tools_from_directory(directory, parent_only=False):
 
 def get_tool_subdirectories(tools_dir):
     """Get all subdirectories in the tools directory"""
-    subdirs = []
-    if os.path.exists(tools_dir):
-        for item in os.listdir(tools_dir):
-            item_path = os.path.join(tools_dir, item)
-            if (
-                os.path.isdir(item_path)
-                and not item.startswith("__")
-                and not item.startswith(".")
-            ):
-                subdirs.append(item)
-    return subdirs
-
-
-def setup_uvicorn_app():
-    """Set up multiple FastMCP apps - one for each subdirectory"""
+    if not os.path.exists(tools_dir):
+        return []
+    with os.scandir(tools_dir) as it:
+        return [
+            entry.name
+            for entry in it
+            if entry.is_dir() and not entry.name.startswith(("__", "."))
+        ]
+
+
+async def setup_uvicorn_app():
+    """Set up multiple FastMCP apps - one for each subdirectory
+
+    Must run on the event loop that will serve the app, since stdio MCP
+    processes are bound to it.
+    """
+    from agency_swarm.integrations.mcp_server import run_mcp
+    from starlette.applications import Starlette
+    from starlette.routing import Mount
+
     setup_python_path()
     config = get_config()
 
     # List to store all mount routes
     routes = []
 
+    def make_app(tools):
+        """Build the SSE app for one endpoint"""
+        fastmcp = run_mcp(tools=tools, return_app=True)
+        return fastmcp.http_app(stateless_http=True, transport="sse")
+
     # Prepare base app, but defer mounting to avoid shadowing sub-mounts
     base_app = None
     base_tools = load_tools_from_directory(
@@ -194,24 +220,17 @@ def setup_uvicorn_app():
     )
 
     if config.include_subdirs or config.split_subdirs:
-        stdio_tools = asyncio.run(load_stdio_mcp_tools(group_by_server=config.split_subdirs))
+        stdio_tools = await load_stdio_mcp_tools(group_by_server=config.split_subdirs)
     else:
         stdio_tools = []
 
-    # Add stdio MCP tools to base path
-    if config.include_subdirs:
-        if config.split_subdirs:
-            stdio_tools_list = []
-            for server_name, server_tools in stdio_tools.items():
-                stdio_tools_list.extend(server_tools)
-            base_tools = base_tools + stdio_tools_list
-        else:
-            base_tools = base_tools + stdio_tools
+    # Add stdio MCP tools to base path (split mode serves them on their own endpoints)
+    if config.include_subdirs and not config.split_subdirs:
+        base_tools = base_tools + stdio_tools
 
     if base_tools:
         print(f"Creating base path with {len(base_tools)} tools")
-        base_fastmcp = run_mcp(tools=base_tools, return_app=True)
-        base_app = base_fastmcp.http_app(stateless_http=True, transport="sse")
+        base_app = make_app(base_tools)
 
     if config.split_subdirs:
         # Create separate apps for each MCP server
@@ -220,11 +239,7 @@ def setup_uvicorn_app():
                 print(
                     f"Creating endpoint for stdio MCP server '/{server_name}' with {len(server_tools)} tools"
                 )
-                server_fastmcp = run_mcp(tools=server_tools, return_app=True)
-                server_app = server_fastmcp.http_app(
-                    stateless_http=True, transport="sse"
-                )
-                routes.append(Mount(f"/{server_name}", app=server_app))
+                routes.append(Mount(f"/{server_name}", app=make_app(server_tools)))
 
         # Get all tool subdirectories
         subdirs = get_tool_subdirectories(config.tools_dir)
@@ -236,21 +251,21 @@ def setup_uvicorn_app():
             subdir_tools = load_tools_from_directory(subdir_path)
 
             if subdir_tools:
-                # Create FastMCP instance for this subdirectory
-                subdir_fastmcp = run_mcp(tools=subdir_tools, return_app=True)
-                # Create the Starlette app for this subdirectory
-                subdir_app = subdir_fastmcp.http_app(
-                    stateless_http=True, transport="sse"
-                )
                 # Mount at the subdirectory path
-                routes.append(Mount(f"/{subdir}", app=subdir_app))
+                routes.append(Mount(f"/{subdir}", app=make_app(subdir_tools)))
 
     # Finally mount the base app at root to avoid swallowing subpaths
     if base_app is not None:
         routes.append(Mount("/", app=base_app))
 
     # Create the main Starlette application with all mounted apps
-    main_app = Starlette(routes=routes)
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        yield
+        # Runs during uvicorn's graceful shutdown, before it re-raises SIGTERM/SIGINT
+        await shutdown_stdio_mcp_servers()
+
+    main_app = Starlette(routes=routes, lifespan=lifespan)
     print(
         f"Setup an app with following routes: \n{'\n'.join([mount.path if mount.path != '' else '/' for mount in routes])}"
     )
@@ -274,19 +289,39 @@ def main():
     print(f"  Instance name: {config.name}")
     print("  Configuration source: ENV vars + CLI args")
 
-    # Set up the application with multiple endpoints (including stdio MCP tools)
-    app = setup_uvicorn_app()
-
-    print(f"\nStarting server on {config.host}:{deployment_port}")
-
-    # Start the server with uvicorn
-    uvicorn.run(
-        app,
+    # The app is attached once it is built on the serving loop
+    server_config = uvicorn.Config(
+        None,
         host=config.host,
         port=deployment_port,  # Use deployment_port, not config.port
         log_level="info",
     )
 
+    # Use uvicorn's configured event loop (uvloop when available), as uvicorn.run() does
+    get_loop_factory = getattr(server_config, "get_loop_factory", None)
+    if get_loop_factory is not None:
+        loop_factory = get_loop_factory()
+    else:
+        # uvicorn < 0.36 installs its loop through the event loop policy
+        server_config.setup_event_loop()
+        loop_factory = None
+
+    async def serve():
+        # Set up the application with multiple endpoints (including stdio MCP tools)
+        try:
+            server_config.app = await setup_uvicorn_app()
+        except BaseException:
+            # Don't leave already started stdio MCP processes behind
+            await shutdown_stdio_mcp_servers()
+            raise
+
+        print(f"\nStarting server on {config.host}:{deployment_port}")
+
+        # Start the server with uvicorn on the same loop as the stdio processes
+        await uvicorn.Server(server_config).serve()
+
+    with asyncio.Runner(loop_factory=loop_factory) as runner:
+        runner.run(serve())
 
 if __name__ == "__main__":
     main()
@@ -1,19 +1,168 @@
 import os
 import json
+import atexit
+import shutil
 import asyncio
-import subprocess
+import functools
+import itertools
 
-from pydantic import Field
-from agency_swarm import BaseTool
+try:
+    import orjson
+except ImportError:  # optional speedup, fall back to stdlib json
+    orjson = None
 
-# Global registry for stdio MCP processes
-mcp_processes = []
+# Resolve commands to executables once; avoids routing through a shell (e.g. cmd.exe)
+_which = functools.lru_cache(maxsize=64)(shutil.which)
+
+# Chunk size for reading stdio MCP output into the per-process buffer
+STDIO_READ_SIZE = 64 * 1024
+
+
+def _dumps(obj) -> bytes:
+    """Serialize a JSON value to bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode()
+
+
+def _dumps_line(obj) -> bytes:
+    """Serialize a JSON-RPC message as a newline-terminated bytes line"""
+    return _dumps(obj) + b"\n"
+
+
+def _loads(data):
+    """Parse a JSON-RPC message from raw bytes or a bytearray"""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except ValueError:
+            # orjson rejects some valid messages (e.g. NaN, >64-bit ints); retry with json
+            pass
+    return json.loads(data.decode().strip())
+
+
+# Global registry for stdio MCP processes, keyed by server name
+mcp_processes = {}
+_cleanup_registered = False
+
+
+def _terminate_stdio_servers():
+    """atexit fallback: signal any stdio MCP process that is still running"""
+    for proc_info in mcp_processes.values():
+        process = proc_info["process"]
+        if process.returncode is None:
+            try:
+                process.terminate()
+            except (ProcessLookupError, RuntimeError):
+                pass
+
+
+async def _stop_stdio_server(proc_info, timeout):
+    """Close a stdio MCP process's stdin and wait for it, escalating to SIGTERM/SIGKILL"""
+    process = proc_info["process"]
+    reader = proc_info.get("reader")
+    if reader is not None:
+        reader.cancel()
+
+    if process.returncode is None:
+        try:
+            process.stdin.close()
+            await asyncio.wait_for(process.wait(), timeout)
+        except asyncio.TimeoutError:
+            try:
+                process.terminate()
+                await asyncio.wait_for(process.wait(), timeout)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+        except ProcessLookupError:
+            pass
+
+
+async def shutdown_stdio_mcp_servers(timeout=2.0):
+    """Stop all stdio MCP processes started by load_stdio_mcp_tools"""
+    await asyncio.gather(
+        *(_stop_stdio_server(p, timeout) for p in mcp_processes.values()),
+        return_exceptions=True,
+    )
+    mcp_processes.clear()
+
+
+async def _read_line(proc_info):
+    """Return the next non-empty newline-delimited line from a stdio MCP process
+
+    Output is accumulated in the process's reusable buffer, so lines of any size
+    are framed without per-read str conversions. Raises EOFError when output ends.
+    """
+    buffer = proc_info["buffer"]
+    stdout = proc_info["process"].stdout
+    scanned = 0
+
+    while True:
+        index = buffer.find(b"\n", scanned)
+        if index < 0:
+            scanned = len(buffer)
+            chunk = await stdout.read(STDIO_READ_SIZE)
+            if not chunk:
+                raise EOFError("MCP process closed its output")
+            buffer.extend(chunk)
+            continue
+
+        line = buffer[:index]
+        del buffer[: index + 1]
+        if line.strip():
+            return line
+        scanned = 0
+
+
+async def _read_responses(proc_info):
+    """Route JSON-RPC responses from a stdio MCP process to their pending callers"""
+    pending = proc_info["pending"]
+    error = ConnectionError("MCP process closed its output")
+
+    try:
+        while True:
+            line = await _read_line(proc_info)
+            try:
+                message = _loads(line)
+            except ValueError:
+                # Not JSON, e.g. stray log output
+                continue
+
+            # Skip notifications and server-initiated requests
+            if not isinstance(message, dict) or "method" in message:
+                continue
+            future = pending.pop(message.get("id"), None)
+            if future is not None and not future.done():
+                future.set_result(message)
+    except EOFError:
+        pass
+    except Exception as e:
+        error = e
+    finally:
+        # Record why the process is unusable so later calls fail immediately,
+        # then fail any calls still waiting on it
+        proc_info["closed"] = error
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+        pending.clear()
 
 
 def create_stdio_mcp_tool(
     name: str, description: str, input_schema: dict, mcp_process_name: str
 ):
     """Create a dynamic BaseTool class for stdio MCP tools"""
+    from pydantic import Field
+    from agency_swarm import BaseTool
+
+    # The tools/call envelope only varies by arguments and id, so encode the rest once
+    request_prefix = (
+        b'{"jsonrpc":"2.0","method":"tools/call","params":{"name":'
+        + _dumps(name)
+        + b',"arguments":'
+    )
+
     # Create the async run method
     async def run_method(self, **kwargs) -> str:
         """Execute the tool by sending JSON-RPC to the stdio MCP process"""
@@ -30,38 +179,33 @@ def create_stdio_mcp_tool(
         call_args.update(kwargs)
 
         # Find the MCP process
-        mcp_process = None
-        for proc_info in mcp_processes:
-            if proc_info["name"] == mcp_process_name:
-                mcp_process = proc_info["process"]
-                break
+        proc_info = mcp_processes.get(mcp_process_name)
+        mcp_process = proc_info["process"] if proc_info else None
 
         if not mcp_process:
             return f"Error: MCP process '{mcp_process_name}' not found"
 
-        # Prepare JSON-RPC request
-        request = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "tools/call",
-            "params": {"name": name, "arguments": call_args},
-        }
+        if proc_info.get("closed") is not None:
+            return f"Error executing tool: {proc_info['closed']}"
+
+        # Each call gets its own id so concurrent calls can share the process
+        request_id = next(proc_info["request_ids"])
+        response_future = asyncio.get_running_loop().create_future()
+        proc_info["pending"][request_id] = response_future
 
         try:
-            # Send request
-            request_str = json.dumps(request) + "\n"
-            mcp_process.stdin.write(request_str.encode())
-            mcp_process.stdin.flush()
-
-            # Read response with timeout
-            response_line = await asyncio.wait_for(
-                asyncio.get_event_loop().run_in_executor(
-                    None, mcp_process.stdout.readline
-                ),
-                timeout=30.0,
+            # Send JSON-RPC request
+            mcp_process.stdin.write(
+                request_prefix
+                + _dumps(call_args)
+                + b'},"id":'
+                + str(request_id).encode()
+                + b"}\n"
             )
+            await mcp_process.stdin.drain()
 
-            response = json.loads(response_line.decode().strip())
+            # Wait for the reader task to deliver the matching response
+            response = await asyncio.wait_for(response_future, timeout=30.0)
 
             if "error" in response:
                 return f"Error: {response['error']}"
@@ -76,6 +220,8 @@ def create_stdio_mcp_tool(
             return "Error: Tool execution timed out"
         except Exception as e:
             return f"Error executing tool: {str(e)}"
+        finally:
+            proc_info["pending"].pop(request_id, None)
 
     # Create tool class attributes from input schema
     tool_attrs = {"run": run_method, "__doc__": description}
@@ -115,8 +261,119 @@ def create_stdio_mcp_tool(
     return type(name, (BaseTool,), tool_attrs)
 
 
+async def _start_stdio_server(server_name, server_config, base_env=None):
+    """Start a single stdio MCP server and return its tool classes
+
+    base_env is a shared copy of os.environ, only needed when some server sets env.
+    Returns None when the server has no command configured.
+    """
+    command = server_config.get("command")
+    args = server_config.get("args", [])
+    env = server_config.get("env", {})
+
+    if not command:
+        print(f"No command specified for MCP server '{server_name}'")
+        return None
+
+    # Start the MCP process
+    executable = _which(command, path=env.get("PATH")) or command
+    process = await asyncio.create_subprocess_exec(
+        executable,
+        *args,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        # Inherit the parent environment unless this server overrides it
+        env={**base_env, **env} if env else None,
+    )
+
+    # Check if process started successfully
+    if process.returncode is not None:
+        stderr_output = (await process.stderr.read()).decode()
+        raise Exception(
+            f"Process failed to start. Exit code: {process.returncode}. Stderr: {stderr_output}"
+        )
+
+    # Store process info
+    proc_info = {
+        "name": server_name,
+        "process": process,
+        "command": command,
+        "args": args,
+        "buffer": bytearray(),
+        "pending": {},
+        # ids 1 and 2 are used by the handshake below
+        "request_ids": itertools.count(3),
+    }
+    mcp_processes[server_name] = proc_info
+
+    # Initialize the MCP server
+    init_request = {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "initialize",
+        "params": {
+            "protocolVersion": "2025-03-26",
+            "capabilities": {},
+            "clientInfo": {"name": "fastmcp-bridge", "version": "1.0.0"},
+        },
+    }
+
+    process.stdin.write(_dumps_line(init_request))
+    await process.stdin.drain()
+
+    # Read initialization response
+    try:
+        await asyncio.wait_for(_read_line(proc_info), timeout=10.0)
+    except EOFError:
+        # Check stderr for error messages
+        stderr_data = (await process.stderr.read(1024)).decode() or "No stderr data"
+        raise Exception(f"Empty response from MCP server. Stderr: {stderr_data}")
+
+    # Send notifications/initialized
+    notif_request = {"jsonrpc": "2.0", "method": "notifications/initialized"}
+    process.stdin.write(_dumps_line(notif_request))
+
+    # Get available tools
+    tools_request = {"jsonrpc": "2.0", "id": 2, "method": "tools/list"}
+    process.stdin.write(_dumps_line(tools_request))
+    await process.stdin.drain()
+
+    # Read tools response
+    tools_response_line = await asyncio.wait_for(_read_line(proc_info), timeout=10.0)
+    tools_response = _loads(tools_response_line)
+
+    # From here on a single reader task owns stdout and dispatches responses by id
+    proc_info["reader"] = asyncio.create_task(_read_responses(proc_info))
+
+    server_tools = []
+    if "result" in tools_response and "tools" in tools_response["result"]:
+        tools_list = tools_response["result"]["tools"]
+        print(
+            f"Found {len(tools_list)} tools in '{server_name}': {[t['name'] for t in tools_list]}"
+        )
+
+        # Create StdioMCPTool instances
+        for tool_def in tools_list:
+            tool_class = create_stdio_mcp_tool(
+                name=tool_def["name"],
+                description=tool_def.get("description", ""),
+                input_schema=tool_def.get("inputSchema", {}),
+                mcp_process_name=server_name,
+            )
+            server_tools.append(tool_class)
+    else:
+        print(f"[ERROR] No tools found in '{server_name}' response: {tools_response}")
+
+    return server_tools
+
+
 async def load_stdio_mcp_tools(group_by_server=False):
-    """Load stdio MCP tools from mcp config file and start their processes"""
+    """Load stdio MCP tools from mcp config file and start their processes
+
+    The processes are bound to the running event loop, so this must be awaited
+    on the same loop that serves the tools.
+    """
     mcp_config_path = os.getenv("MCP_CONFIG_PATH", None)
 
     if not mcp_config_path:
@@ -136,129 +393,38 @@ async def load_stdio_mcp_tools(group_by_server=False):
     stdio_tools = []
     tools_by_server = {}
 
-    for server_name, server_config in mcp_config.get("mcpServers", {}).items():
-        command = server_config.get("command")
-        args = server_config.get("args", [])
-        env = server_config.get("env", {})
+    # Start all servers concurrently; each handshake is independent I/O
+    servers = list(mcp_config.get("mcpServers", {}).items())
+    base_env = (
+        os.environ.copy()
+        if any(server_config.get("env") for _, server_config in servers)
+        else None
+    )
+    global _cleanup_registered
+    if servers and not _cleanup_registered:
+        atexit.register(_terminate_stdio_servers)
+        _cleanup_registered = True
+
+    results = await asyncio.gather(
+        *(
+            _start_stdio_server(server_name, server_config, base_env)
+            for server_name, server_config in servers
+        ),
+        return_exceptions=True,
+    )
 
-        if not command:
-            print(f"No command specified for MCP server '{server_name}'")
+    for (server_name, _), server_tools in zip(servers, results):
+        if server_tools is None:
             continue
-
-        try:
-            # Start the MCP process
-            process = subprocess.Popen(
-                [command] + args,
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=False,
-                shell=True if os.name == "nt" else False,  # Use shell on Windows
-                env={**os.environ, **env},
-            )
-
-            # Check if process started successfully
-            if process.poll() is not None:
-                stderr_output = process.stderr.read().decode()
-                raise Exception(
-                    f"Process failed to start. Exit code: {process.returncode}. Stderr: {stderr_output}"
-                )
-
-            # Store process info
-            mcp_processes.append(
-                {
-                    "name": server_name,
-                    "process": process,
-                    "command": command,
-                    "args": args,
-                }
-            )
-
-            # Initialize the MCP server
-            init_request = {
-                "jsonrpc": "2.0",
-                "id": 1,
-                "method": "initialize",
-                "params": {
-                    "protocolVersion": "2025-03-26",
-                    "capabilities": {},
-                    "clientInfo": {"name": "fastmcp-bridge", "version": "1.0.0"},
-                },
-            }
-
-            init_str = json.dumps(init_request) + "\n"
-            process.stdin.write(init_str.encode())
-            process.stdin.flush()
-
-            # Read initialization response
-            init_response_line = await asyncio.wait_for(
-                asyncio.get_event_loop().run_in_executor(None, process.stdout.readline),
-                timeout=10.0,
-            )
-            init_response_raw = init_response_line.decode().strip()
-
-            if not init_response_raw:
-                # Check stderr for error messages
-                stderr_data = (
-                    process.stderr.read(1024).decode()
-                    if process.stderr.readable()
-                    else "No stderr data"
-                )
-                raise Exception(
-                    f"Empty response from MCP server. Stderr: {stderr_data}"
-                )
-
-            # Send notifications/initialized
-            notif_request = {"jsonrpc": "2.0", "method": "notifications/initialized"}
-            notif_str = json.dumps(notif_request) + "\n"
-            process.stdin.write(notif_str.encode())
-            process.stdin.flush()
-
-            # Get available tools
-            tools_request = {"jsonrpc": "2.0", "id": 2, "method": "tools/list"}
-            tools_str = json.dumps(tools_request) + "\n"
-            process.stdin.write(tools_str.encode())
-            process.stdin.flush()
-
-            # Read tools response
-            tools_response_line = await asyncio.wait_for(
-                asyncio.get_event_loop().run_in_executor(None, process.stdout.readline),
-                timeout=10.0,
-            )
-            tools_response = json.loads(tools_response_line.decode().strip())
-
+        if isinstance(server_tools, BaseException):
+            print(f"Error starting MCP server '{server_name}': {server_tools}")
             server_tools = []
-            if "result" in tools_response and "tools" in tools_response["result"]:
-                tools_list = tools_response["result"]["tools"]
-                print(
-                    f"Found {len(tools_list)} tools in '{server_name}': {[t['name'] for t in tools_list]}"
-                )
-
-                # Create StdioMCPTool instances
-                for tool_def in tools_list:
-                    tool_class = create_stdio_mcp_tool(
-                        name=tool_def["name"],
-                        description=tool_def.get("description", ""),
-                        input_schema=tool_def.get("inputSchema", {}),
-                        mcp_process_name=server_name,
-                    )
-                    stdio_tools.append(tool_class)
-                    server_tools.append(tool_class)
-            else:
-                print(
-                    f"[ERROR] No tools found in '{server_name}' response: {tools_response}"
-                )
 
-            if group_by_server:
-                tools_by_server[server_name] = server_tools
-
-        except Exception as e:
-            print(f"Error starting MCP server '{server_name}': {e}")
-            if group_by_server:
-                tools_by_server[server_name] = []
-            continue
+        stdio_tools.extend(server_tools)
+        if group_by_server:
+            tools_by_server[server_name] = server_tools
 
     print(
         f"Loaded {len(stdio_tools)} stdio MCP tools from {len(mcp_processes)} processes"
     )
-    return tools_by_server if group_by_server else stdio_tools
\ No newline at end of file
+    return tools_by_server if group_by_server else stdio_tools